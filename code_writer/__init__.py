@@ -1,13 +1,72 @@
 from contextlib import contextmanager
+from functools import lru_cache
 import re
 import textwrap
-from typing import Generator, List, Optional, Tuple
+from typing import Generator, Iterable, List, Optional, TextIO, Tuple
 
 
-_split_words_capitalization_re = re.compile(
-    "^[a-z0-9]+|[A-Z][a-z0-9]+|[A-Z]+(?=[A-Z][a-z0-9])|[A-Z]+$"
+# Names made only of ASCII letters and digits joined by separators, with no
+# leading or trailing separator. These are split by _words_re alone.
+_simple_name_re = re.compile("[A-Za-z0-9]+(?:[-_/]+[A-Za-z0-9]+)*", re.ASCII)
+_words_re = re.compile(
+    "[a-z0-9]+|[A-Z][a-z0-9]+|[A-Z]+(?=[A-Z][a-z0-9])|[A-Z]+", re.ASCII
 )
-_split_words_dashes_re = re.compile("[-_/]+")
+
+# Matches either a run of separators or one word. The word alternatives
+# anchor to the edges of the separator-delimited segment they appear in, so a
+# single scan over the name splits the same way as splitting on separators
+# and then on capitalization. Like "$", the trailing anchor also matches
+# before a newline that ends its segment.
+_split_words_re = re.compile(
+    "(?P<sep>[-_/]+)"
+    "|(?<![^-_/])[a-z0-9]+"
+    "|[A-Z][a-z0-9]+"
+    "|[A-Z]+(?=[A-Z][a-z0-9])"
+    "|[A-Z]+(?=\n?(?![^-_/]))",
+    re.ASCII,
+)
+
+
+@lru_cache(maxsize=4096)
+def _split_words(name: str) -> Tuple[str, ...]:
+    if _simple_name_re.fullmatch(name):
+        return tuple(_words_re.findall(name))
+    words = []
+    seg_start = 0
+    seg_matched = False
+    for m in _split_words_re.finditer(name):
+        if m.lastgroup == "sep":
+            # A segment without any word is kept whole. This includes the
+            # empty segments at leading and trailing separators.
+            if not seg_matched:
+                words.append(name[seg_start : m.start()])
+            seg_start = m.end()
+            seg_matched = False
+        else:
+            words.append(m.group())
+            seg_matched = True
+    if not seg_matched:
+        words.append(name[seg_start:])
+    return tuple(words)
+
+
+def _lower_words_or_none(joined: str, sep: str) -> Optional[str]:
+    """
+    Returns joined if it's lowercase ASCII words separated by single seps, in
+    which case splitting and re-joining it would be a no-op. Otherwise, None.
+    The fmt_* helpers are memoized, so this only speeds up the first call for
+    each name.
+    """
+    if (
+        joined.islower()
+        and joined.isascii()
+        and joined.replace(sep, "").isalnum()
+        and sep + sep not in joined
+        and joined[0] != sep
+        and joined[-1] != sep
+    ):
+        return joined
+    return None
 
 
 def split_words(name: str) -> List[str]:
@@ -16,54 +75,85 @@ def split_words(name: str) -> List[str]:
         Example: 'GetFile' -> ['Get', 'File']
         Example: 'get_file' -> ['get', 'file']
     """
-    all_words = []
-    for word in re.split(_split_words_dashes_re, name):
-        vals = _split_words_capitalization_re.findall(word)
-        if vals:
-            all_words.extend(vals)
-        else:
-            all_words.append(word)
-    return all_words
+    return list(_split_words(name))
 
 
+@lru_cache(maxsize=4096)
 def fmt_camel(name: str) -> str:
     """
     Converts name to lower camel case. Words are identified by capitalization,
     dashes, and underscores.
     """
-    words = split_words(name)
-    assert len(words) > 0
-    first = words.pop(0).lower()
-    return first + "".join([word.capitalize() for word in words])
+    if name.isalnum() and name.isascii() and name.islower():
+        return name
+    words = _split_words(name)
+    return words[0].lower() + "".join([word.capitalize() for word in words[1:]])
 
 
+@lru_cache(maxsize=4096)
 def fmt_dashes(name: str) -> str:
     """
     Converts name to words separated by dashes. Words are identified by
     capitalization, dashes, and underscores.
     """
-    return "-".join([word.lower() for word in split_words(name)])
+    fast = _lower_words_or_none(name.replace("_", "-").replace("/", "-"), "-")
+    if fast is not None:
+        return fast
+    return "-".join(_split_words(name)).lower()
 
 
+@lru_cache(maxsize=4096)
 def fmt_pascal(name: str) -> str:
     """
     Converts name to pascal case. Words are identified by capitalization,
     dashes, and underscores.
     """
-    return "".join([word.capitalize() for word in split_words(name)])
+    return "".join([word.capitalize() for word in _split_words(name)])
 
 
+@lru_cache(maxsize=4096)
 def fmt_underscores(name: str) -> str:
     """
     Converts name to words separated by underscores. Words are identified by
     capitalization, dashes, and underscores.
     """
-    return "_".join([word.lower() for word in split_words(name)])
+    fast = _lower_words_or_none(name.replace("-", "_").replace("/", "_"), "_")
+    if fast is not None:
+        return fast
+    return "_".join(_split_words(name)).lower()
 
 
 TDelim = Tuple[Optional[str], Optional[str]]
 
 
+class _StreamBuffer(List[str]):
+    """
+    A line buffer that writes lines through to an output stream as they are
+    added. Only trailing empty lines are held back, so that the trim_*
+    methods can still remove them.
+    """
+
+    def __init__(self, output: TextIO) -> None:
+        super().__init__()
+        self._output = output
+
+    def append(self, line: str) -> None:
+        if line == "\n":
+            super().append(line)
+        else:
+            self.flush()
+            self._output.write(line)
+
+    def extend(self, lines: Iterable[str]) -> None:
+        for line in lines:
+            self.append(line)
+
+    def flush(self) -> None:
+        if self:
+            self._output.write("".join(self))
+            self.clear()
+
+
 class CodeWriter:
 
     def __init__(
@@ -72,8 +162,10 @@ class CodeWriter:
         default_dent: Optional[int] = None,
         default_delim: TDelim = (None, None),
         default_width: int = 80,
+        output: Optional[TextIO] = None,
     ) -> None:
         assert isinstance(use_tabs, bool), "Expected bool, got %r" % type(use_tabs)
+        self._cur_indent = 0
         self.use_tabs = use_tabs
         if default_dent is None:
             self.default_dent = 1 if use_tabs else 4
@@ -81,14 +173,44 @@ class CodeWriter:
             self.default_dent = default_dent
         self.default_delim = default_delim
         self.default_width = default_width
-        self.cur_indent = 0
-        self._buffer: List[str] = []
+        # Each entry is one line of output including its trailing newline, so
+        # render() is a single join and trimming can still work per line.
+        self._buffer: List[str] = [] if output is None else _StreamBuffer(output)
+        # Reconfigured on each emit_wrapped_text() call. Like the rest of
+        # CodeWriter's state, this is not safe to share across threads.
+        self._wrapper = textwrap.TextWrapper()
+
+    @property
+    def use_tabs(self) -> bool:
+        return self._use_tabs
+
+    @use_tabs.setter
+    def use_tabs(self, value: bool) -> None:
+        self._use_tabs = value
+        self._indent_unit = "\t" if value else " "
+        self._indent_str = self._indent_unit * self._cur_indent
+
+    @property
+    def cur_indent(self) -> int:
+        return self._cur_indent
+
+    @cur_indent.setter
+    def cur_indent(self, value: int) -> None:
+        # Indentation only changes at block boundaries, so build the string
+        # here rather than on every emitted line.
+        self._cur_indent = value
+        self._indent_str = self._indent_unit * value
 
     def render(self) -> str:
-        if self._buffer:
-            return "\n".join(self._buffer) + "\n"
-        else:
+        """
+        Returns the output. If an output stream was given, lines have already
+        been written to it, so this writes any held back empty lines and
+        returns an empty string.
+        """
+        if isinstance(self._buffer, _StreamBuffer):
+            self._buffer.flush()
             return ""
+        return "".join(self._buffer)
 
     @contextmanager
     def indent(self, dent: Optional[int] = None) -> Generator[None, None, None]:
@@ -109,26 +231,35 @@ class CodeWriter:
         created with no indentation.
         """
         assert "\n" not in s, "String to emit cannot contain newline strings."
+        # Writes to the buffer directly: s is a single line, so emit_raw()'s
+        # checks and line splitting would be wasted work.
         if s:
-            self.emit_raw("%s%s\n" % (self.mk_indent(), s))
+            self._buffer.append(self._indent_str + s + "\n")
         else:
-            self.emit_raw("\n")
+            self._buffer.append("\n")
 
     def mk_indent(self) -> str:
-        return ("\t" if self.use_tabs else " ") * self.cur_indent
+        return self._indent_str
 
     def mk_one_indent(self) -> str:
-        return ("\t" if self.use_tabs else " ") * self.default_dent
+        return self._indent_unit * self.default_dent
 
     def emit_raw(self, s: str) -> None:
         """
         Adds the input string to the output buffer. The string must end in a
         newline. It may contain any number of newline characters. No
-        indentation is generated.
+        indentation is generated. Only "\\n" ends a line; other characters
+        such as "\\r" are kept as part of the line.
         """
-        if len(s) > 0 and s[-1] != "\n":
+        if not s:
+            return
+        if s[-1] != "\n":
             raise AssertionError("Input string to emit_raw must end with a newline.")
-        self._buffer.extend(s.splitlines())
+        if s.count("\n") == 1:
+            # A single newline-terminated line can be buffered as-is.
+            self._buffer.append(s)
+            return
+        self._buffer.extend([line + "\n" for line in s[:-1].split("\n")])
 
     @contextmanager
     def block(
@@ -158,42 +289,42 @@ class CodeWriter:
                 is ignored. For more details about indent styles see
                 http://en.wikipedia.org/wiki/Indent_style
         """
-        if delim is None:
-            delim = self.default_delim
+        open_delim, close_delim = self.default_delim if delim is None else delim
         if dent is None:
             dent = self.default_dent
-        if before and not allman:
-            if delim[0] is not None:
-                self.emit("{} {}".format(before, delim[0]))
-            else:
+        assert dent >= 0, "dent must None or >= 0."
+        if open_delim is None:
+            if before:
                 self.emit(before)
+        elif before and not allman:
+            self.emit(before + " " + open_delim)
         else:
             if before:
                 self.emit(before)
-            if delim[0] is not None:
-                self.emit(delim[0])
+            self.emit(open_delim)
 
-        with self.indent(dent):
-            yield
+        # Same as indent(dent), without nesting a second generator.
+        self.cur_indent += dent
+        yield
+        self.cur_indent -= dent
 
-        if delim[1] is not None:
-            self.emit(delim[1] + after)
-        else:
-            if after:
-                self.emit(after)
+        if close_delim is not None:
+            self.emit(close_delim + after)
+        elif after:
+            self.emit(after)
 
     def trim_last_line_if_empty(self) -> None:
         """
         If the last emit call was an empty line, undo it.
         """
-        if self._buffer and self._buffer[-1] == "":
+        if self._buffer and self._buffer[-1] == "\n":
             self._buffer.pop()
 
     def trim_trailing_empty_lines(self) -> None:
         """
         Removes all empty lines at the end of the current buffer.
         """
-        while self._buffer and self._buffer[-1] == "":
+        while self._buffer and self._buffer[-1] == "\n":
             self._buffer.pop()
 
     def emit_wrapped_text(
@@ -209,8 +340,8 @@ class CodeWriter:
     ) -> None:
         """
         Adds the input string to the output buffer with indentation and
-        wrapping. The wrapping is performed by the :func:`textwrap.fill` Python
-        library function.
+        wrapping. The wrapping is performed by the :class:`textwrap.TextWrapper`
+        Python library class.
 
         Args:
             s: The input string to wrap.
@@ -236,17 +367,13 @@ class CodeWriter:
         prefix = self.mk_indent() + prefix
         if indent_after_first:
             subsequent_prefix = self.mk_one_indent() + subsequent_prefix
-        self.emit_raw(
-            textwrap.fill(
-                s,
-                initial_indent=prefix + initial_prefix,
-                subsequent_indent=prefix + subsequent_prefix,
-                width=width,
-                break_long_words=break_long_words,
-                break_on_hyphens=break_on_hyphens,
-            )
-            + "\n"
-        )
+        wrapper = self._wrapper
+        wrapper.width = width
+        wrapper.initial_indent = prefix + initial_prefix
+        wrapper.subsequent_indent = prefix + subsequent_prefix
+        wrapper.break_long_words = break_long_words
+        wrapper.break_on_hyphens = break_on_hyphens
+        self.emit_raw(wrapper.fill(s) + "\n")
 
     def emit_list(
         self,
@@ -292,29 +419,31 @@ class CodeWriter:
             return
 
         if compact:
-            self.emit(before + bracket[0] + items[0] + sep)
-
-            def emit_items(items: List[str]) -> None:
-                for i, item in enumerate(items[1:]):
-                    if i == len(items) - 2:
-                        self.emit(item + bracket[1] + after)
-                    else:
-                        self.emit(item + sep)
-
-            if before or bracket[0]:
-                with self.indent(len(before) + len(bracket[0])):
-                    emit_items(items)
-            else:
-                emit_items(items)
+            emit = self.emit
+            emit(before + bracket[0] + items[0] + sep)
+            # Align the remaining items with the first one.
+            dent = len(before) + len(bracket[0])
+            self.cur_indent += dent
+            for item in items[1:-1]:
+                emit(item + sep)
+            emit(items[-1] + bracket[1] + after)
+            self.cur_indent -= dent
         else:
             if before or bracket[0]:
                 self.emit(before + bracket[0])
-            with self.indent():
-                for i, item in enumerate(items):
-                    if i == len(items) - 1 and skip_last_sep:
-                        self.emit(item)
-                    else:
-                        self.emit(item + sep)
+            # Every item is a line at the same indentation, so build them all
+            # in one pass instead of calling emit() per item.
+            assert "\n" not in sep.join(
+                items
+            ), "String to emit cannot contain newline strings."
+            indent = self._indent_str + self.mk_one_indent()
+            # Like emit(), an empty line gets no indentation.
+            lines = [
+                indent + item + sep + "\n" if item or sep else "\n" for item in items
+            ]
+            if skip_last_sep:
+                lines[-1] = indent + items[-1] + "\n" if items[-1] else "\n"
+            self._buffer.extend(lines)
             if bracket[1] or after:
                 self.emit(bracket[1] + after)
             elif bracket[1]:
@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 
+import io
 import textwrap
 import unittest
 
@@ -9,6 +10,7 @@ from code_writer import (
     fmt_dashes,
     fmt_pascal,
     fmt_underscores,
+    split_words,
 )
 
 
@@ -32,6 +34,15 @@ class TestBasic(unittest.TestCase):
         """
         )
 
+        # Only "\n" ends a line.
+        cw = CodeWriter()
+        cw.emit_raw("hello,\r\nworld.\rok\n")
+        assert cw.render() == "hello,\r\nworld.\rok\n"
+
+        cw = CodeWriter()
+        cw.emit_raw("")
+        assert cw.render() == ""
+
         cw = CodeWriter()
         with self.assertRaises(AssertionError) as ctx:
             cw.emit_raw("hello,\nworld.")
@@ -50,6 +61,44 @@ class TestBasic(unittest.TestCase):
         cw.emit_raw("\n\n\n")
         assert cw.render() == "\n\n\n"
 
+    def test_output_stream(self) -> None:
+        out = io.StringIO()
+        cw = CodeWriter(output=out)
+        with cw.block("if:"):
+            cw.emit("a")
+            assert out.getvalue() == "if:\n    a\n"
+            cw.emit()
+            cw.emit()
+            # Trailing empty lines are held back until a non-empty line.
+            assert out.getvalue() == "if:\n    a\n"
+            cw.trim_last_line_if_empty()
+            cw.emit_list(["b", "c"], ("[", "]"))
+        cw.emit()
+        cw.emit()
+        assert cw.render() == ""
+        assert out.getvalue() == textwrap.dedent(
+            """\
+            if:
+                a
+
+                [
+                    b,
+                    c,
+                ]
+
+
+        """
+        )
+
+        out = io.StringIO()
+        cw = CodeWriter(output=out)
+        cw.emit("a")
+        cw.emit()
+        cw.emit()
+        cw.trim_trailing_empty_lines()
+        assert cw.render() == ""
+        assert out.getvalue() == "a\n"
+
     def test_indent(self) -> None:
         # Test spaces
         cw = CodeWriter()
@@ -111,6 +160,14 @@ class TestBasic(unittest.TestCase):
         """
         )
 
+        # Changing use_tabs later takes effect, including mid-indent.
+        cw = CodeWriter()
+        with cw.indent(1):
+            cw.emit("a")
+            cw.use_tabs = True
+            cw.emit("b")
+        assert cw.render() == " a\n\tb\n"
+
     def test_block(self) -> None:
         cw = CodeWriter()
         with cw.block("if {", "}"):
@@ -367,12 +424,27 @@ class TestBasic(unittest.TestCase):
         """
         )
 
+        # Empty lines are not indented, so they can be trimmed.
+        cw = CodeWriter()
+        cw.emit_list(["a", ""], bracket, sep="", skip_last_sep=True)
+        assert cw.render() == "[\n    a\n\n]\n"
+
+        cw = CodeWriter()
+        with self.assertRaises(AssertionError) as ctx:
+            cw.emit_list(["a\nb", "c"], bracket)
+        assert ctx.exception.args[0] == "String to emit cannot contain newline strings."
+
         # Try compact mode with tabs
         cw = CodeWriter(use_tabs=True)
         with self.assertRaises(AssertionError) as ctx:
             cw.emit_list(["a", "b"], bracket, compact=True)
         assert ctx.exception.args[0] == "Cannot use compact mode with tabs for indents."
 
+        cw = CodeWriter()
+        cw.use_tabs = True
+        with self.assertRaises(AssertionError):
+            cw.emit_list(["a", "b"], bracket, compact=True)
+
     def test_fmt(self) -> None:
         text = "a-B-HiHo-merryOh_yes_no_XYZ"
         assert fmt_camel(text) == "aBHiHoMerryOhYesNoXyz"
@@ -380,6 +452,51 @@ class TestBasic(unittest.TestCase):
         assert fmt_pascal(text) == "ABHiHoMerryOhYesNoXyz"
         assert fmt_underscores(text) == "a_b_hi_ho_merry_oh_yes_no_xyz"
 
+        # Already-lowercase names take a shortcut that skips the regex; these
+        # check it agrees with the full split, including the cases it rejects.
+        assert fmt_dashes("get_file") == "get-file"
+        assert fmt_dashes("get/file") == "get-file"
+        assert fmt_dashes("get__file") == "get-file"
+        assert fmt_dashes("-get") == "-get"
+        assert fmt_dashes("getFile") == "get-file"
+        assert fmt_underscores("get-file") == "get_file"
+        assert fmt_underscores("get/file") == "get_file"
+        assert fmt_underscores("get__file") == "get_file"
+        assert fmt_underscores("-get") == "_get"
+        assert fmt_underscores("get1") == "get1"
+        assert fmt_camel("get1") == "get1"
+        assert fmt_camel("get-file") == "getFile"
+        assert fmt_camel("-get") == "Get"
+
+        # Leading and trailing separators are preserved.
+        assert fmt_underscores("_private") == "_private"
+        assert fmt_underscores("__init__") == "_init_"
+        assert fmt_dashes("foo_") == "foo-"
+        assert fmt_dashes("__") == "-"
+        assert fmt_underscores("__") == "_"
+
+        # Non-ASCII names are not split or dropped.
+        assert fmt_underscores("Ünïcode") == "ünïcode"
+        assert fmt_dashes("get_Ünïcode") == "get-ünïcode"
+
+    def test_split_words(self) -> None:
+        assert split_words("GetFile") == ["Get", "File"]
+        assert split_words("get_file") == ["get", "file"]
+        assert split_words("HTTPServer") == ["HTTP", "Server"]
+        assert split_words("v2Api") == ["v2", "Api"]
+        # Runs of separators split once; leading and trailing ones keep an
+        # empty word at the edge.
+        assert split_words("_get__file/") == ["", "get", "file", ""]
+        assert split_words("") == [""]
+        # As with "$", a trailing all-caps word may end before a final newline.
+        assert split_words("A_B\n") == ["A", "B"]
+        # Segments without any recognized word are kept whole.
+        assert split_words("get_Ünïcode") == ["get", "Ünïcode"]
+
+        # Results are memoized, so callers must not be able to mutate them.
+        split_words("GetFile").append("Extra")
+        assert split_words("GetFile") == ["Get", "File"]
+
 
 if __name__ == "__main__":
     unittest.main()